@@ -5,7 +5,7 @@ Large Image Viewer - Entry Point
 Run this script to start the viewer.
 
 Usage:
-    python run.py [--port 5000] [--no-browser]
+    python run.py [--port 5000] [--no-browser] [--dev]
 """
 
 from src.app import main
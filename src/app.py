@@ -5,7 +5,7 @@ Large Image Viewer
 A simple, high-performance viewer for very large images using OpenSeadragon.
 
 Usage:
-    python -m src.app [--port 5000] [--no-browser]
+    python -m src.app [--port 5000] [--no-browser] [--dev]
 
 Or run directly:
     python src/app.py
@@ -13,14 +13,39 @@ Or run directly:
 
 import argparse
 import datetime
+import gzip
 import logging
-import json
+import mimetypes
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
 import webbrowser
 import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
+from stat import S_ISREG
 
-from flask import Flask, request, send_from_directory, jsonify
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# libvips reads its thread count once at init, so set it before importing pyvips.
+# CONVERT_WORKERS conversions run at once, so each gets an equal share of the cores.
+_CPU_COUNT = os.cpu_count() or 1
+os.environ.setdefault("VIPS_CONCURRENCY", str(max(1, _CPU_COUNT // max(1, _CPU_COUNT // 2))))
+
+from flask import Flask, Request, request, send_from_directory, jsonify, abort
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
+import orjson
 import pyvips
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 
 # Configure logging
@@ -35,26 +60,173 @@ logger = logging.getLogger(__name__)
 # =============================================================================
 
 ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "tiff", "tif", "bmp", "webp"}
+_ALLOWED_SUFFIXES = tuple(f".{ext}" for ext in ALLOWED_EXTENSIONS)
 MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # Copy buffer for saving small uploads
+UPLOAD_SPOOL_SIZE = 500 * 1024  # Larger uploads are spooled straight into TILES_DIR
+VIPS_CONCURRENCY = int(os.environ["VIPS_CONCURRENCY"])  # libvips threads per pipeline
+
+# Parallel image conversions across all server processes, enforced with lock
+# files in TILES_DIR (each one also uses VIPS_CONCURRENCY threads)
+CONVERT_WORKERS = max(1, _CPU_COUNT // 2)
+
+# The server process that owns a conversion touches its progress file every
+# JOB_HEARTBEAT seconds; one left untouched for JOB_STALE_AFTER seconds belongs
+# to a process that died, so the job is reported as failed and can be retried
+JOB_HEARTBEAT = 10
+JOB_STALE_AFTER = 60
+
+# Tile format - WebP is ~30% smaller than JPEG at the same visual quality
+TILE_SUFFIX = ".webp[Q=80,effort=4]"
+TILE_SIZE = 512  # Larger tiles = fewer HTTP requests
+THUMB_SIZE = 128  # Sidebar preview, longest side in pixels
+
+# Hand tile bytes to a front-end server instead of sending them from Python.
+# TILES_ACCEL_REDIRECT is the nginx `internal` location aliased to the tiles
+# directory (e.g. "/internal-tiles/"); USE_X_SENDFILE=1 is for Apache/lighttpd.
+TILES_ACCEL_REDIRECT = os.environ.get("TILES_ACCEL_REDIRECT", "")
+USE_X_SENDFILE = os.environ.get("USE_X_SENDFILE") == "1"
 
 # Directories
 SRC_DIR = Path(__file__).parent
 BASE_DIR = SRC_DIR.parent
 TILES_DIR = BASE_DIR / "tiles"
 STATIC_DIR = SRC_DIR / "static"
+FONTS_DIR = STATIC_DIR / "vendor" / "fonts"
+FONT_FILES = (  # See README
+    "inter/Inter-Regular.woff2",
+    "inter/Inter-Medium.woff2",
+    "inter/Inter-SemiBold.woff2",
+    "material-symbols/Material-Symbols-Outlined.woff2",
+)
+INDEX_PATH = TILES_DIR / "index.json"  # {name: meta} for every processed image
 
 # Create tiles directory
 TILES_DIR.mkdir(exist_ok=True)
 
+# Not in every Python's mimetypes table
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("application/xml", ".dzi")
+
+# The operation cache only helps when the same operation is repeated;
+# each upload is a one-shot streaming pipeline
+pyvips.cache_set_max(0)
+
+# Tiles are written with TILE_SUFFIX, so libvips must have been built with that saver
+if TILE_SUFFIX.split("[")[0] not in pyvips.get_suffixes():
+    logger.warning(
+        f"libvips cannot save {TILE_SUFFIX.split('[')[0]} - uploads will fail. "
+        "Install a libvips built with libwebp (see README)."
+    )
+
 # =============================================================================
 # Flask App
 # =============================================================================
 
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson for jsonify() and request.json."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+class UploadRequest(Request):
+    """Request that spools large uploads into TILES_DIR instead of the system temp dir.
+
+    The upload is then hard-linked to its conversion path, so a multi-GB image
+    is written to disk once rather than written, read back and copied.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_SIZE:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        # Removed automatically when the request is closed
+        return tempfile.NamedTemporaryFile("wb+", dir=TILES_DIR, prefix="_upload_")
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.config["MAX_CONTENT_LENGTH"] = MAX_FILE_SIZE
+app.config["USE_X_SENDFILE"] = USE_X_SENDFILE
+app.json = OrjsonProvider(app)
+
+# Compress text responses (page, /images JSON, manifests); tiles are already compressed
+app.config["COMPRESS_MIMETYPES"] = [
+    "application/json",
+    "application/xml",
+    "text/html",
+    "text/css",
+    "application/javascript",
+]
+app.config["COMPRESS_LEVEL"] = 6
+app.config["COMPRESS_REGISTER"] = False  # compress_response() decides
+compress = Compress(app)
+
+
+@app.after_request
+def compress_response(response):
+    # A 206 holds a byte range of the uncompressed body, so it is sent as is
+    if response.status_code == 206:
+        return response
+    return compress.after_request(response)
+
+
+JOBS = {}  # safe_name -> Future of _convert_job, for this process's running jobs
+_executor = None
+_executor_lock = threading.Lock()
+_index_lock = threading.Lock()  # _locked_index() also takes a file lock, for other processes
+_index_cache = (None, {})  # ((ino, mtime_ns, size) of INDEX_PATH, parsed index)
 
 def allowed_file(filename: str) -> bool:
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return this process's conversion pool, creating it on first use.
+
+    Conversions run in worker processes so uploads return immediately and
+    several images can be tiled at once. The pool is created lazily so each
+    forked gunicorn worker gets its own, and "spawn" avoids forking a process
+    that already has libvips threads running.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=CONVERT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_convert_worker,
+            )
+            threading.Thread(target=_heartbeat, name="job-heartbeat", daemon=True).start()
+        return _executor
+
+
+def _init_convert_worker():
+    """Pool initializer: exit when the server process that owns the pool dies.
+
+    A killed or recycled gunicorn worker would otherwise leave its pool
+    processes running forever.
+    """
+    threading.Thread(target=_exit_with_parent, name="parent-watch", daemon=True).start()
+
+
+def _exit_with_parent():
+    multiprocessing.parent_process().join()
+    os._exit(1)
+
+
+def _heartbeat():
+    """Keep this process's jobs from looking dead (see JOB_STALE_AFTER)."""
+    while True:
+        time.sleep(JOB_HEARTBEAT)
+        for safe_name in list(JOBS):
+            try:
+                os.utime(TILES_DIR / f"_progress_{safe_name}")
+            except OSError:
+                pass  # Finished in the meantime
 
 
 # =============================================================================
@@ -63,7 +235,13 @@ def allowed_file(filename: str) -> bool:
 
 @app.route("/")
 def index():
-    return INDEX_HTML
+    fonts_fetched = all((FONTS_DIR / name).is_file() for name in FONT_FILES)
+    return _index_page(fonts_fetched)
+
+
+@lru_cache(maxsize=2)
+def _index_page(fonts_fetched: bool) -> str:
+    return INDEX_HTML.replace("  <!-- fonts -->\n", SELF_HOSTED_FONTS_HTML if fonts_fetched else GOOGLE_FONTS_HTML)
 
 
 @app.route("/static/<path:filename>")
@@ -75,15 +253,34 @@ def serve_static(filename):
 @app.route("/tiles/<path:filename>")
 def serve_tiles(filename):
     """Serve DZI tiles with aggressive caching."""
-    response = send_from_directory(TILES_DIR, filename)
+    if filename.endswith(".dzi"):
+        # Manifests are fetched every time an image is opened - serve from memory
+        path, stat = _stat_tile(filename)
+        data = _read_dzi(path, stat.st_mtime_ns)
+        response = app.response_class(data, mimetype="application/xml")
+        _make_conditional(response, stat, complete_length=len(data))
+    elif TILES_ACCEL_REDIRECT:
+        # nginx streams the file itself; we only validate the path
+        path, stat = _stat_tile(filename)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = app.response_class(mimetype=mimetype)
+        _make_conditional(response, stat)
+        if response.status_code != 304:
+            response.headers['X-Accel-Redirect'] = f"{TILES_ACCEL_REDIRECT.rstrip('/')}/{filename}"
+    else:
+        # Sets ETag/Last-Modified and answers If-None-Match with a 304.
+        # Under gunicorn the body goes through wsgi.file_wrapper, i.e. sendfile(2)
+        response = send_from_directory(TILES_DIR, filename, conditional=True, etag=True)
     # Tiles are immutable - cache for 7 days
     response.headers['Cache-Control'] = 'public, max-age=604800, immutable'
+    # Every branch honours Range (nginx does it itself for X-Accel-Redirect)
+    response.headers['Accept-Ranges'] = 'bytes'
     return response
 
 
 @app.route("/upload", methods=["POST"])
 def upload():
-    """Upload and convert image to DZI format."""
+    """Upload an image and queue its conversion to DZI format."""
     try:
         if "file" not in request.files:
             return jsonify(success=False, error="No file provided"), 400
@@ -100,12 +297,11 @@ def upload():
         name_without_ext = Path(original_filename).stem
         safe_name = secure_filename(name_without_ext) or f"image_{int(datetime.datetime.now().timestamp())}"
         
-        # Check if already processed
-        dzi_path = TILES_DIR / f"{safe_name}.dzi"
-        if dzi_path.exists():
+        # Check if already processed (and not being processed again right now)
+        meta = {} if _job_is_running(safe_name) else _load_finished_job(safe_name)
+        if meta:
             # Already have this image, just return the URL
             logger.info(f"Image '{safe_name}' already processed, reusing tiles")
-            meta = load_metadata(safe_name)
             return jsonify(
                 success=True,
                 dzi_url=f"/tiles/{safe_name}.dzi",
@@ -113,80 +309,83 @@ def upload():
                 cached=True
             )
         
+        # Claim the name before writing anything, so each image is converted
+        # once across all server processes; other uploads follow that job
+        if not _claim_job(safe_name):
+            return jsonify(success=True, name=safe_name, status_url=f"/status/{safe_name}"), 202
+        
         # Save uploaded file temporarily
         temp_path = TILES_DIR / f"_temp_{safe_name}{Path(original_filename).suffix}"
+        progress_path = TILES_DIR / f"_progress_{safe_name}"
         
         logger.info(f"Processing: {original_filename}")
-        file.save(str(temp_path))
-        
         try:
-            # Convert to DZI using pyvips
-            logger.info("Converting to Deep Zoom format...")
-            image = pyvips.Image.new_from_file(str(temp_path), access="sequential")
-            
-            # DZI output path (pyvips adds .dzi automatically)
-            output_base = TILES_DIR / safe_name
-            
-            image.dzsave(
-                str(output_base),
-                tile_size=512,      # Larger tiles = fewer HTTP requests
-                overlap=1,
-                suffix=".jpg[Q=85]", # JPEG quality 85 - good balance
-                container="fs",
-                strip=True,          # Remove metadata from tiles
-            )
-            
-            # Get metadata
-            file_size = temp_path.stat().st_size
-            width, height = image.width, image.height
-            
-            meta = {
-                "original_name": original_filename,
-                "width": width,
-                "height": height,
-                "size": file_size,
-                "file_type": Path(original_filename).suffix[1:].lower(),
-                "processed_at": datetime.datetime.now().isoformat(timespec="seconds"),
-                "megapixels": round(width * height / 1_000_000, 1),
-            }
-            
-            # Save metadata
-            save_metadata(safe_name, meta)
-            
-            logger.info(f"Done! {width}x{height} ({meta['megapixels']} MP)")
-            
-            return jsonify(
-                success=True,
-                dzi_url=f"/tiles/{safe_name}.dzi",
-                meta=meta,
-                cached=False
-            )
-            
-        finally:
-            # Clean up temp file
-            if temp_path.exists():
-                temp_path.unlink()
+            # May be left over from an interrupted job - never write into it
+            temp_path.unlink(missing_ok=True)
+            _save_upload(file, temp_path)
+            job = get_executor().submit(_convert_job, str(temp_path), safe_name, original_filename)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            progress_path.unlink(missing_ok=True)
+            raise
+        JOBS[safe_name] = job
+        job.add_done_callback(lambda future: _finish_job(safe_name, future))
+        
+        return jsonify(success=True, name=safe_name, status_url=f"/status/{safe_name}"), 202
                 
-    except pyvips.Error as e:
-        logger.error(f"Image processing error: {e}")
-        return jsonify(success=False, error=f"Failed to process image: {str(e)}"), 500
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return jsonify(success=False, error="Internal server error"), 500
 
 
+@app.route("/status/<name>")
+def job_status(name):
+    """Report the state of an image conversion."""
+    safe_name = secure_filename(name)
+    
+    # Job state lives in files, so any server process can answer. The progress
+    # file lives until the job is fully recorded as done or failed.
+    progress_path = TILES_DIR / f"_progress_{safe_name}"
+    if _job_is_running(safe_name):
+        try:
+            progress = int(progress_path.read_text())
+        except (OSError, ValueError):
+            progress = 0
+        return jsonify(success=True, state="processing", progress=progress)
+    
+    # Also covers a job whose worker finished after its server process died
+    meta = _load_finished_job(safe_name)
+    if meta:
+        return jsonify(
+            success=True,
+            state="done",
+            progress=100,
+            dzi_url=f"/tiles/{safe_name}.dzi",
+            meta=meta,
+        )
+    
+    if progress_path.exists():
+        return jsonify(
+            success=False, state="error", error="Processing was interrupted - please upload again"
+        ), 500
+    
+    try:
+        error = (TILES_DIR / f"_error_{safe_name}").read_text()
+    except FileNotFoundError:
+        pass
+    else:
+        return jsonify(success=False, state="error", error=error), 500
+    
+    return jsonify(success=False, state="unknown", error="Image not found"), 404
+
+
 @app.route("/images")
 def list_images():
     """List all processed images."""
-    images = []
-    for dzi_file in TILES_DIR.glob("*.dzi"):
-        name = dzi_file.stem
-        meta = load_metadata(name)
-        images.append({
-            "name": name,
-            "dzi_url": f"/tiles/{name}.dzi",
-            "meta": meta
-        })
+    images = [
+        {"name": name, "dzi_url": f"/tiles/{name}.dzi", "meta": meta}
+        for name, meta in load_index().items()
+    ]
     # Sort by processed date, newest first
     images.sort(key=lambda x: x.get("meta", {}).get("processed_at", ""), reverse=True)
     return jsonify(images=images)
@@ -195,15 +394,15 @@ def list_images():
 @app.route("/delete/<name>", methods=["POST"])
 def delete_image(name):
     """Delete a processed image and its tiles."""
-    import shutil
-    
     safe_name = secure_filename(name)
     dzi_path = TILES_DIR / f"{safe_name}.dzi"
     tiles_path = TILES_DIR / f"{safe_name}_files"
-    meta_path = TILES_DIR / f"{safe_name}_meta.json"
+    meta_paths = [TILES_DIR / f"{safe_name}_meta.json.gz", TILES_DIR / f"{safe_name}_meta.json"]
+    thumb_path = TILES_DIR / f"{safe_name}_thumb.jpg"
+    error_path = TILES_DIR / f"_error_{safe_name}"
     
     deleted = False
-    for path in [dzi_path, meta_path]:
+    for path in [dzi_path, *meta_paths, thumb_path, error_path]:
         if path.exists():
             path.unlink()
             deleted = True
@@ -213,6 +412,8 @@ def delete_image(name):
         deleted = True
     
     if deleted:
+        update_index(safe_name, None)
+        _read_dzi.cache_clear()
         logger.info(f"Deleted: {safe_name}")
         return jsonify(success=True)
     else:
@@ -223,35 +424,462 @@ def delete_image(name):
 # Helpers
 # =============================================================================
 
+def _claim_job(safe_name: str) -> bool:
+    """Atomically mark an image as converting, for every server process.
+
+    Returns False if another upload of the same name already holds it. A job
+    whose server process died is taken over.
+    """
+    progress_path = TILES_DIR / f"_progress_{safe_name}"
+    if not _create_progress_file(progress_path):
+        if not _job_is_dead(progress_path):
+            return False  # Running, or finished just now
+        # Several processes may see the same dead job. Replace its progress
+        # file only under a lock, after checking again, so just one takes over.
+        with _file_lock(TILES_DIR / "_claim.lock"):
+            if not _job_is_dead(progress_path):
+                return False
+            logger.warning(f"Conversion of '{safe_name}' was interrupted, starting over")
+            progress_path.unlink()
+            if not _create_progress_file(progress_path):
+                return False
+    (TILES_DIR / f"_error_{safe_name}").unlink(missing_ok=True)
+    return True
+
+
+def _create_progress_file(progress_path: Path) -> bool:
+    try:
+        # "x" fails if the file exists, so exactly one process wins
+        with open(progress_path, "x") as f:
+            f.write("0")
+    except FileExistsError:
+        return False
+    return True
+
+
+def _job_is_running(safe_name: str) -> bool:
+    age = _progress_age(TILES_DIR / f"_progress_{safe_name}")
+    return age is not None and age <= JOB_STALE_AFTER
+
+
+def _job_is_dead(progress_path: Path) -> bool:
+    age = _progress_age(progress_path)
+    return age is not None and age > JOB_STALE_AFTER
+
+
+def _progress_age(progress_path: Path):
+    """Seconds since a job's progress file was touched, or None if there is none."""
+    try:
+        return time.time() - progress_path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _save_upload(file, temp_path: Path):
+    """Write an upload to temp_path, hard-linking it when it is already on disk."""
+    # Large uploads were spooled next to the tiles; small ones are in memory
+    # (a SpooledTemporaryFile's name is None)
+    spool_name = getattr(file.stream, "name", None)
+    if isinstance(spool_name, str):
+        try:
+            file.stream.flush()
+            os.link(spool_name, temp_path)
+            return
+        except OSError:
+            pass  # Filesystem without hard links
+    file.stream.seek(0)
+    with open(temp_path, "wb") as fh:
+        shutil.copyfileobj(file.stream, fh, UPLOAD_CHUNK_SIZE)
+
+
+def _stat_tile(filename: str):
+    """Resolve a file under TILES_DIR and stat it, or abort with 404."""
+    path = safe_join(str(TILES_DIR), filename)
+    try:
+        stat = os.stat(path) if path else None
+    except OSError:
+        stat = None
+    if stat is None or not S_ISREG(stat.st_mode):
+        abort(404)
+    return path, stat
+
+
+def _make_conditional(response, stat, complete_length=None):
+    """Add validators and answer If-None-Match/If-Modified-Since with a 304.
+
+    Pass complete_length for responses that carry the body, so Range requests
+    get a 206 with just the requested bytes.
+    """
+    # Tiles never change in place, so mtime + size identifies the content. Same
+    # format as nginx's own ETag, which replaces ours behind X-Accel-Redirect.
+    response.set_etag(f"{int(stat.st_mtime):x}-{stat.st_size:x}")
+    response.last_modified = stat.st_mtime
+    response.make_conditional(
+        request, accept_ranges=complete_length is not None, complete_length=complete_length
+    )
+
+
+@lru_cache(maxsize=512)
+def _read_dzi(path: str, mtime_ns: int) -> bytes:
+    # mtime is part of the key so a re-processed image is never served stale,
+    # even when it was replaced by another server process
+    with open(path, "rb") as f:
+        return f.read()
+
+
 def load_metadata(name: str) -> dict:
-    """Load metadata for an image."""
-    meta_path = TILES_DIR / f"{name}_meta.json"
-    if meta_path.exists():
+    """Load metadata for an image (gzipped, or plain JSON from older versions)."""
+    for meta_path in (TILES_DIR / f"{name}_meta.json.gz", TILES_DIR / f"{name}_meta.json"):
+        try:
+            stat = meta_path.stat()
+        except OSError:
+            continue
         try:
-            return json.loads(meta_path.read_text())
+            return _load_metadata_cached(str(meta_path), stat.st_mtime_ns, stat.st_size)
         except Exception:
-            pass
+            break
     return {}
 
 
-def save_metadata(name: str, meta: dict):
-    """Save metadata for an image."""
-    meta_path = TILES_DIR / f"{name}_meta.json"
-    meta_path.write_text(json.dumps(meta, indent=2))
+@lru_cache(maxsize=4096)
+def _load_metadata_cached(path: str, mtime_ns: int, size: int) -> dict:
+    # Keyed on the file version, so a rewrite from any process is picked up
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        data = gzip.decompress(data)
+    return orjson.loads(data)
+
+
+def save_metadata(tiles_dir: Path, name: str, meta: dict):
+    """Save metadata for an image. The index is updated separately, by update_index()."""
+    meta_path = tiles_dir / f"{name}_meta.json.gz"
+    meta_path.write_bytes(gzip.compress(orjson.dumps(meta)))
+
+
+def _load_finished_job(safe_name: str) -> dict:
+    """Metadata of a fully converted image, or {} if there is none.
+
+    The sidecar is written last, so tiles without one are incomplete. An image
+    missing from the index - its server process died before recording it - is
+    added here.
+    """
+    if not (TILES_DIR / f"{safe_name}.dzi").exists():
+        return {}
+    meta = load_metadata(safe_name)
+    if meta and load_index().get(safe_name) != meta:
+        update_index(safe_name, meta)
+    return meta
+
+
+def load_index() -> dict:
+    """Load the {name: meta} index, rebuilding it from the tiles directory if needed."""
+    index = _read_index()
+    if index is None:
+        with _locked_index():
+            # Another process may have rebuilt it while we waited
+            index = _read_index()
+            if index is None:
+                index = _scan_index()
+                _write_index(index)
+    return index
+
+
+def update_index(name: str, meta):
+    """Add an image to the index, or remove it when meta is None."""
+    # Locked from read to replace, or two server processes updating at once
+    # would each drop the other's entry
+    with _locked_index():
+        index = _read_index()
+        index = _scan_index() if index is None else dict(index)  # The cached one is shared
+        if meta is None:
+            index.pop(name, None)
+        else:
+            index[name] = meta
+        _write_index(index)
+
+
+def _read_index():
+    """Return the parsed index, or None if it is missing or unreadable."""
+    global _index_cache
+    try:
+        # Only re-parse when the file changed; otherwise this is a single stat()
+        stat = INDEX_PATH.stat()
+        # A replaced index is a new inode, even where mtime is too coarse to change
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if _index_cache[0] != version:
+            _index_cache = (version, orjson.loads(INDEX_PATH.read_bytes()))
+        return _index_cache[1]
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Image index is unreadable, rebuilding")
+        return None
+
+
+def _scan_index() -> dict:
+    """Build the index from the *.dzi files in the tiles directory."""
+    # scandir gives names without building a Path per entry
+    with os.scandir(TILES_DIR) as entries:
+        names = [entry.name[:-4] for entry in entries if entry.name.endswith(".dzi")]
+    return {name: load_metadata(name) for name in names}
+
+
+@contextmanager
+def _locked_index():
+    """Hold the index lock, for this process's threads and every other process."""
+    with _index_lock, _file_lock(TILES_DIR / "_index.lock"):
+        yield
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Hold an exclusive lock on path, shared with every other process."""
+    with open(path, "a") as lock_file:
+        _lock_file(lock_file)
+        try:
+            yield
+        finally:
+            _unlock_file(lock_file)
+
+
+def _lock_file(f, blocking: bool = True) -> bool:
+    """Take an exclusive lock on an open file. False if blocking=False and it is held."""
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    # msvcrt locks a byte range; LK_LOCK gives up after 10 s, so poll instead
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_index(index: dict):
+    # Write-then-rename so readers never see a half-written index
+    tmp_path = TILES_DIR / f"_index_{os.getpid()}.tmp"
+    tmp_path.write_bytes(orjson.dumps(index))
+    os.replace(tmp_path, INDEX_PATH)
+
+
+# =============================================================================
+# Conversion
+# =============================================================================
+
+def _convert_job(temp_path: str, safe_name: str, original_filename: str) -> dict:
+    """Convert an uploaded image to DZI. Runs in a get_executor() worker process."""
+    temp_path = Path(temp_path)
+    # The upload sits in the tiles directory, which this process may not share
+    # TILES_DIR with (it is re-imported under spawn)
+    tiles_dir = temp_path.parent
+    progress_path = tiles_dir / f"_progress_{safe_name}"
+    
+    try:
+        # Queued here, not in the pool: every server process has its own pool
+        with _conversion_slot(tiles_dir):
+            # Convert to DZI using pyvips
+            logger.info(f"Converting to Deep Zoom format ({VIPS_CONCURRENCY} threads)...")
+            logger.debug(f"libvips cache before: {pyvips.cache_get_size()} operations")
+            # Sequential access streams the image top-to-bottom through dzsave
+            image = pyvips.Image.new_from_file(str(temp_path), access="sequential")
+            # Read the header now, while the image is fresh - dzsave consumes the
+            # sequential pipeline
+            width, height = image.width, image.height
+            
+            # Publish percent complete for /status
+            last_percent = [0]
+            
+            def on_eval(_image, progress):
+                if progress.percent != last_percent[0]:
+                    last_percent[0] = progress.percent
+                    progress_path.write_text(str(progress.percent))
+            
+            image.set_progress(True)
+            image.signal_connect("eval", on_eval)
+            
+            # DZI output path (pyvips adds .dzi automatically)
+            output_base = tiles_dir / safe_name
+            
+            image.dzsave(
+                str(output_base),
+                tile_size=TILE_SIZE,
+                overlap=1,
+                suffix=TILE_SUFFIX,
+                container="fs",
+                strip=True,          # Remove metadata from tiles
+            )
+            
+            logger.debug(f"libvips cache after: {pyvips.cache_get_size()} operations")
+            
+            # Get metadata
+            file_size = temp_path.stat().st_size
+            
+            meta = {
+                "original_name": original_filename,
+                "width": width,
+                "height": height,
+                "size": file_size,
+                "file_type": Path(original_filename).suffix[1:].lower(),
+                "processed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "megapixels": round(width * height / 1_000_000, 1),
+            }
+            
+            _save_thumbnail(tiles_dir, safe_name, width, height)
+            # Last, so a sidecar means the image is complete even if the server
+            # process that started the job dies before recording it
+            save_metadata(tiles_dir, safe_name, meta)
+            
+            logger.info(f"Done! {width}x{height} ({meta['megapixels']} MP)")
+            return meta
+    
+    finally:
+        # Clean up temp file
+        temp_path.unlink(missing_ok=True)
+
+
+@contextmanager
+def _conversion_slot(tiles_dir: Path):
+    """Wait for one of the CONVERT_WORKERS conversion slots shared by all processes."""
+    while True:
+        for slot in range(CONVERT_WORKERS):
+            lock_file = open(tiles_dir / f"_convert_{slot}.lock", "a")
+            if _lock_file(lock_file, blocking=False):
+                try:
+                    yield
+                finally:
+                    _unlock_file(lock_file)
+                    lock_file.close()
+                return
+            lock_file.close()
+        time.sleep(0.5)
+
+
+def _save_thumbnail(tiles_dir: Path, safe_name: str, width: int, height: int):
+    """Save a small JPEG preview, made from the pyramid level that fits in one tile."""
+    # dzsave's top level is ceil(log2(longest side)); each level below halves it
+    longest = max(width, height)
+    top_level = (longest - 1).bit_length()
+    level = top_level - ((longest - 1) // TILE_SIZE).bit_length()
+    tile_ext = TILE_SUFFIX.split("[")[0]
+    tile_path = tiles_dir / f"{safe_name}_files" / str(level) / f"0_0{tile_ext}"
+    
+    try:
+        thumb = pyvips.Image.thumbnail(str(tile_path), THUMB_SIZE)
+        thumb.jpegsave(str(tiles_dir / f"{safe_name}_thumb.jpg"), Q=80, strip=True)
+    except pyvips.Error as e:
+        # The sidebar falls back to an icon
+        logger.warning(f"Could not create thumbnail for '{safe_name}': {e}")
+
+
+def _finish_job(safe_name: str, future):
+    """Record a finished conversion. Runs in the web process, not the worker.
+
+    Failures are written to an _error_ file, so /status reports them from any
+    server process.
+    """
+    JOBS.pop(safe_name, None)
+    try:
+        meta = future.result()
+    except pyvips.Error as e:
+        logger.error(f"Image processing error: {e}")
+        (TILES_DIR / f"_error_{safe_name}").write_text(f"Failed to process image: {e}")
+    except (Exception, CancelledError) as e:
+        logger.error(f"Unexpected error: {e!r}")
+        (TILES_DIR / f"_error_{safe_name}").write_text("Internal server error")
+    else:
+        # Indexing here keeps index writes out of the worker processes
+        update_index(safe_name, meta)
+    finally:
+        (TILES_DIR / f"_progress_{safe_name}").unlink(missing_ok=True)
 
 
 # =============================================================================
 # HTML Template
 # =============================================================================
 
+# Self-hosted fonts - no third-party request before first paint
+SELF_HOSTED_FONTS_HTML = """  <link rel="preload" href="/static/vendor/fonts/inter/Inter-Regular.woff2" as="font" type="font/woff2" crossorigin>
+  <link rel="preload" href="/static/vendor/fonts/material-symbols/Material-Symbols-Outlined.woff2" as="font" type="font/woff2" crossorigin>
+  <style>
+    @font-face {
+      font-family: 'Inter';
+      font-style: normal;
+      font-weight: 400;
+      font-display: swap;
+      src: url('/static/vendor/fonts/inter/Inter-Regular.woff2') format('woff2');
+    }
+    
+    @font-face {
+      font-family: 'Inter';
+      font-style: normal;
+      font-weight: 500;
+      font-display: swap;
+      src: url('/static/vendor/fonts/inter/Inter-Medium.woff2') format('woff2');
+    }
+    
+    @font-face {
+      font-family: 'Inter';
+      font-style: normal;
+      font-weight: 600;
+      font-display: swap;
+      src: url('/static/vendor/fonts/inter/Inter-SemiBold.woff2') format('woff2');
+    }
+    
+    /* block, not swap: a fallback font would flash the icon names as text */
+    @font-face {
+      font-family: 'Material Symbols Outlined';
+      font-style: normal;
+      font-weight: 400;
+      font-display: block;
+      src: url('/static/vendor/fonts/material-symbols/Material-Symbols-Outlined.woff2') format('woff2');
+    }
+    
+    .material-symbols-outlined {
+      font-family: 'Material Symbols Outlined';
+      font-weight: normal;
+      font-style: normal;
+      font-size: 24px;
+      line-height: 1;
+      letter-spacing: normal;
+      text-transform: none;
+      display: inline-block;
+      white-space: nowrap;
+      word-wrap: normal;
+      direction: ltr;
+      font-feature-settings: 'liga';
+      -webkit-font-smoothing: antialiased;
+    }
+  </style>
+"""
+
+# Until the font files are fetched (see README) the page uses Google Fonts
+GOOGLE_FONTS_HTML = """  <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&display=swap" rel="stylesheet">
+  <link href="https://fonts.googleapis.com/css2?family=Material+Symbols+Outlined:opsz,wght,FILL,GRAD@20..48,100..700,0..1,-50..200" rel="stylesheet">
+"""
+
 INDEX_HTML = """<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
   <title>Large Image Viewer</title>
-  <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&display=swap" rel="stylesheet">
-  <link href="https://fonts.googleapis.com/css2?family=Material+Symbols+Outlined:opsz,wght,FILL,GRAD@20..48,100..700,0..1,-50..200" rel="stylesheet">
+  <!-- fonts -->
   <script src="/static/vendor/openseadragon/openseadragon.min.js"></script>
   <style>
     * { box-sizing: border-box; margin: 0; padding: 0; }
@@ -395,6 +1023,27 @@ INDEX_HTML = """<!DOCTYPE html>
     
     .image-item.active .material-symbols-outlined { color: white; }
     
+    .image-thumb {
+      position: relative;
+      width: 40px;
+      height: 40px;
+      flex-shrink: 0;
+      display: flex;
+      align-items: center;
+      justify-content: center;
+      border-radius: 4px;
+      overflow: hidden;
+      background: var(--bg);
+    }
+    
+    .image-thumb img {
+      position: absolute;
+      inset: 0;
+      width: 100%;
+      height: 100%;
+      object-fit: cover;
+    }
+    
     .image-info {
       flex: 1;
       min-width: 0;
@@ -548,6 +1197,10 @@ INDEX_HTML = """<!DOCTYPE html>
     let viewer = null;
     let currentImage = null;
     
+    // HTTP/2+ multiplexes requests on one connection, so more tiles can be in flight
+    const navEntry = performance.getEntriesByType('navigation')[0];
+    const multiplexed = /^h[23]/.test(navEntry?.nextHopProtocol || '');
+    
     // ===========================================
     // Elements
     // ===========================================
@@ -607,19 +1260,21 @@ INDEX_HTML = """<!DOCTYPE html>
       xhr.onload = () => {
         try {
           const data = JSON.parse(xhr.responseText);
-          if (data.success) {
-            progressFill.style.width = '100%';
-            progressText.textContent = data.cached ? 'Already processed!' : 'Done!';
-            showToast(data.cached ? 'Image loaded from cache' : 'Image processed successfully', 'success');
-            loadImageList();
-            loadImage(data.dzi_url, data.meta);
-          } else {
+          if (!data.success) {
             showToast(data.error || 'Upload failed', 'error');
+            progress.classList.remove('active');
+          } else if (data.status_url) {
+            // Conversion runs in the background - poll until tiles are ready
+            progressFill.style.width = '50%';
+            progressText.textContent = 'Processing image...';
+            pollStatus(data.status_url);
+          } else {
+            finishUpload(data);
           }
         } catch (e) {
           showToast('Upload failed', 'error');
+          progress.classList.remove('active');
         }
-        setTimeout(() => progress.classList.remove('active'), 1000);
       };
       
       xhr.onerror = () => {
@@ -627,19 +1282,39 @@ INDEX_HTML = """<!DOCTYPE html>
         progress.classList.remove('active');
       };
       
-      // Simulate processing progress after upload
-      xhr.onreadystatechange = () => {
-        if (xhr.readyState === 4) return;
-        if (xhr.readyState === 3) {
-          progressFill.style.width = '75%';
-          progressText.textContent = 'Processing image...';
-        }
-      };
-      
       xhr.open('POST', '/upload');
       xhr.send(formData);
     }
     
+    async function pollStatus(url) {
+      try {
+        const resp = await fetch(url);
+        const data = await resp.json();
+        if (data.state === 'processing') {
+          progressFill.style.width = (50 + data.progress / 2) + '%'; // Processing is 50-100%
+          progressText.textContent = `Processing: ${data.progress}%`;
+          setTimeout(() => pollStatus(url), 1000);
+        } else if (data.success) {
+          finishUpload(data);
+        } else {
+          showToast(data.error || 'Processing failed', 'error');
+          progress.classList.remove('active');
+        }
+      } catch (e) {
+        showToast('Processing failed', 'error');
+        progress.classList.remove('active');
+      }
+    }
+    
+    function finishUpload(data) {
+      progressFill.style.width = '100%';
+      progressText.textContent = data.cached ? 'Already processed!' : 'Done!';
+      showToast(data.cached ? 'Image loaded from cache' : 'Image processed successfully', 'success');
+      loadImageList();
+      loadImage(data.dzi_url, data.meta);
+      setTimeout(() => progress.classList.remove('active'), 1000);
+    }
+    
     // ===========================================
     // Image list
     // ===========================================
@@ -657,7 +1332,10 @@ INDEX_HTML = """<!DOCTYPE html>
       imageList.innerHTML = images.map(img => `
         <div class="image-item ${currentImage === img.dzi_url ? 'active' : ''}" 
              data-url="${img.dzi_url}" data-name="${img.name}">
-          <span class="material-symbols-outlined">image</span>
+          <div class="image-thumb">
+            <span class="material-symbols-outlined">image</span>
+            <img src="/tiles/${img.name}_thumb.jpg" alt="" loading="lazy" onerror="this.remove()">
+          </div>
           <div class="image-info">
             <div class="image-name">${img.meta?.original_name || img.name}</div>
             <div class="image-meta">${img.meta?.width || '?'}×${img.meta?.height || '?'} · ${formatSize(img.meta?.size)}</div>
@@ -729,10 +1407,11 @@ INDEX_HTML = """<!DOCTYPE html>
         
         // Performance optimizations
         immediateRender: true,
-        imageLoaderLimit: 4,
-        maxImageCacheCount: 500,
+        imageLoaderLimit: multiplexed ? 16 : 4,
+        maxImageCacheCount: 200,  // A decoded 512px RGBA tile is 1 MiB, so up to ~200 MB
         timeout: 60000,
-        useCanvas: true,
+        // Tiles as GPU textures (OpenSeadragon 5+); canvas where WebGL is unavailable
+        drawer: ['webgl', 'canvas'],
         
         // Navigation
         showNavigator: true,
@@ -871,10 +1550,12 @@ Examples:
   python viewer.py                  # Start on port 5000, open browser
   python viewer.py --port 8080      # Use different port
   python viewer.py --no-browser     # Don't auto-open browser
+  python viewer.py --dev            # Use Flask's development server
         """
     )
     parser.add_argument("--port", type=int, default=5000, help="Port to run on (default: 5000)")
     parser.add_argument("--no-browser", action="store_true", help="Don't auto-open browser")
+    parser.add_argument("--dev", action="store_true", help="Use Flask's development server")
     args = parser.parse_args()
     
     print("""
@@ -894,10 +1575,50 @@ Examples:
     if not args.no_browser:
         threading.Thread(target=open_browser, args=(args.port,), daemon=True).start()
     
-    # Run Flask (use threaded mode for better tile serving)
+    if args.dev:
+        run_dev_server(args.port)
+    else:
+        run_server(args.port)
+
+
+def run_server(port: int):
+    """Serve with gunicorn, or waitress where gunicorn can't run (Windows)."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+    
+    if BaseApplication is not None:
+        class ViewerApplication(BaseApplication):
+            def load_config(self):
+                # Tile bursts are many small requests - spread them over all cores
+                self.cfg.set("bind", f"127.0.0.1:{port}")  # Localhost only for security
+                self.cfg.set("workers", os.cpu_count() or 1)
+                self.cfg.set("worker_class", "gthread")
+                self.cfg.set("threads", 8)
+                self.cfg.set("timeout", 300)  # Multi-GB uploads
+            
+            def load(self):
+                return app
+        
+        ViewerApplication().run()
+        return
+    
+    try:
+        import waitress
+    except ImportError:
+        logger.warning("Neither gunicorn nor waitress is available, using Flask's development server")
+        run_dev_server(port)
+        return
+    
+    waitress.serve(app, host="127.0.0.1", port=port, threads=16)
+
+
+def run_dev_server(port: int):
+    """Run Flask's built-in server (use threaded mode for better tile serving)."""
     app.run(
         host="127.0.0.1",  # Localhost only for security
-        port=args.port,
+        port=port,
         debug=False,
         threaded=True,
     )
@@ -0,0 +1,56 @@
+"""Image index tests."""
+
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src import app as viewer
+
+
+@pytest.fixture
+def tiles_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(viewer, "TILES_DIR", tmp_path)
+    monkeypatch.setattr(viewer, "INDEX_PATH", tmp_path / "index.json")
+    return tmp_path
+
+
+def add_entries(tiles_dir, worker, count):
+    # Runs in a separate process, like a gunicorn worker
+    viewer.TILES_DIR = tiles_dir
+    viewer.INDEX_PATH = tiles_dir / "index.json"
+    for i in range(count):
+        viewer.update_index(f"{worker}_{i}", {"n": i})
+
+
+def test_concurrent_updates_keep_every_entry(tiles_dir):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(4, mp_context=context) as pool:
+        jobs = [pool.submit(add_entries, tiles_dir, worker, 50) for worker in range(4)]
+        for job in jobs:
+            job.result()
+    
+    assert len(viewer.load_index()) == 200
+
+
+def test_legacy_metadata_is_read_and_indexed(tiles_dir):
+    # Written by versions before the gzipped sidecars
+    (tiles_dir / "old.dzi").write_text("<Image/>")
+    (tiles_dir / "old_meta.json").write_text(json.dumps({"width": 640}, indent=2))
+    
+    assert viewer.load_metadata("old") == {"width": 640}
+    assert viewer.load_index() == {"old": {"width": 640}}
+
+
+def test_delete_removes_both_metadata_formats(tiles_dir):
+    (tiles_dir / "old.dzi").write_text("<Image/>")
+    (tiles_dir / "old_meta.json").write_text(json.dumps({"width": 640}, indent=2))
+    viewer.save_metadata(tiles_dir, "old", {"width": 640})
+    assert "old" in viewer.load_index()
+    
+    response = viewer.app.test_client().post("/delete/old")
+    assert response.status_code == 200
+    assert not (tiles_dir / "old_meta.json").exists()
+    assert not (tiles_dir / "old_meta.json.gz").exists()
+    assert viewer.load_index() == {}
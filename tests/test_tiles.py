@@ -0,0 +1,60 @@
+"""Tile serving tests."""
+
+import os
+
+import pytest
+
+from src import app as viewer
+
+TILE_URL = "/tiles/sample_files/0/0_0.webp"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(viewer, "TILES_DIR", tmp_path)
+    tile_path = tmp_path / "sample_files" / "0" / "0_0.webp"
+    tile_path.parent.mkdir(parents=True)
+    tile_path.write_bytes(bytes(104))
+    os.utime(tile_path, (1_700_000_000, 1_700_000_000))
+    return viewer.app.test_client()
+
+
+def test_tile_revalidation_returns_304(client):
+    response = client.get(TILE_URL)
+    assert response.status_code == 200
+    assert len(response.data) == 104
+    
+    response = client.get(TILE_URL, headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_accel_redirect_hands_the_tile_to_nginx(client, monkeypatch):
+    monkeypatch.setattr(viewer, "TILES_ACCEL_REDIRECT", "/internal-tiles/")
+    
+    response = client.get(TILE_URL)
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == "/internal-tiles/sample_files/0/0_0.webp"
+    assert response.data == b""
+    # nginx sends its own "<mtime hex>-<size hex>" ETag, so browsers revalidate with that
+    assert response.headers["ETag"] == '"6553f100-68"'
+
+
+def test_accel_redirect_answers_revalidation_itself(client, monkeypatch):
+    monkeypatch.setattr(viewer, "TILES_ACCEL_REDIRECT", "/internal-tiles/")
+    
+    response = client.get(TILE_URL, headers={"If-None-Match": '"6553f100-68"'})
+    assert response.status_code == 304
+    assert "X-Accel-Redirect" not in response.headers
+
+
+def test_manifest_ranges_are_not_compressed(client, tmp_path):
+    manifest = b'<?xml version="1.0"?>' + b" " * 2000
+    (tmp_path / "sample.dzi").write_bytes(manifest)
+    
+    response = client.get("/tiles/sample.dzi", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    
+    response = client.get("/tiles/sample.dzi", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.data == manifest[:100]
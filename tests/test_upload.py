@@ -0,0 +1,127 @@
+"""Upload and conversion round-trip tests."""
+
+import io
+import os
+import time
+
+import pytest
+import pyvips
+
+from src import app as viewer
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(viewer, "TILES_DIR", tmp_path)
+    monkeypatch.setattr(viewer, "INDEX_PATH", tmp_path / "index.json")
+    return viewer.app.test_client()
+
+
+def wait_for_job(client, status_url):
+    for _ in range(240):
+        status = client.get(status_url).get_json()
+        if status["state"] != "processing":
+            return status
+        time.sleep(0.25)
+    pytest.fail("conversion did not finish")
+
+
+# Uploads up to UPLOAD_SPOOL_SIZE stay in memory, larger ones are hard-linked
+@pytest.mark.parametrize("width, height", [(64, 48), (3000, 2000)], ids=["in-memory", "spooled"])
+def test_upload_converts(client, width, height):
+    data = pyvips.Image.gaussnoise(width, height).write_to_buffer(".png")
+    assert (len(data) > viewer.UPLOAD_SPOOL_SIZE) == (width > 64)
+    
+    response = client.post("/upload", data={"file": (io.BytesIO(data), "sample.png")})
+    assert response.status_code == 202, response.get_json()
+    
+    status = wait_for_job(client, response.get_json()["status_url"])
+    assert status["state"] == "done", status
+    assert (status["meta"]["width"], status["meta"]["height"]) == (width, height)
+    assert client.get("/tiles/sample.dzi").status_code == 200
+
+
+def test_upload_follows_running_job(client, tmp_path):
+    # Another server process is already converting this image
+    (tmp_path / "_progress_sample").write_text("40")
+    data = pyvips.Image.black(32, 32).write_to_buffer(".png")
+    
+    response = client.post("/upload", data={"file": (io.BytesIO(data), "sample.png")})
+    assert response.status_code == 202
+    assert not (tmp_path / "_temp_sample.png").exists()
+    assert client.get(response.get_json()["status_url"]).get_json()["progress"] == 40
+
+
+def test_failed_conversion_is_reported(client, tmp_path):
+    response = client.post("/upload", data={"file": (io.BytesIO(b"not a png"), "broken.png")})
+    assert response.status_code == 202
+    
+    status = wait_for_job(client, response.get_json()["status_url"])
+    assert status["state"] == "error"
+    assert status["error"].startswith("Failed to process image")
+    assert not viewer.JOBS
+    # Recorded on disk, so every server process gives the same answer
+    assert (tmp_path / "_error_broken").exists()
+
+
+def test_interrupted_job_is_restarted(client, tmp_path):
+    # Left behind by a server process that died mid-conversion
+    progress_path = tmp_path / "_progress_sample"
+    progress_path.write_text("40")
+    stale = time.time() - viewer.JOB_STALE_AFTER - 1
+    os.utime(progress_path, (stale, stale))
+    assert client.get("/status/sample").get_json()["state"] == "error"
+    
+    data = pyvips.Image.black(32, 32).write_to_buffer(".png")
+    response = client.post("/upload", data={"file": (io.BytesIO(data), "sample.png")})
+    assert response.status_code == 202
+    assert wait_for_job(client, response.get_json()["status_url"])["state"] == "done"
+
+
+def test_conversions_wait_for_a_free_slot(client, tmp_path):
+    # Every slot is taken by conversions in other server processes
+    slots = [open(tmp_path / f"_convert_{slot}.lock", "a") for slot in range(viewer.CONVERT_WORKERS)]
+    for lock_file in slots:
+        assert viewer._lock_file(lock_file, blocking=False)
+    
+    data = pyvips.Image.black(32, 32).write_to_buffer(".png")
+    response = client.post("/upload", data={"file": (io.BytesIO(data), "sample.png")})
+    status_url = response.get_json()["status_url"]
+    time.sleep(2)
+    assert client.get(status_url).get_json()["state"] == "processing"
+    
+    for lock_file in slots:
+        lock_file.close()
+    assert wait_for_job(client, status_url)["state"] == "done"
+
+
+def test_job_finished_after_its_server_process_died(client, tmp_path):
+    # The worker wrote the tiles and the sidecar, but nothing indexed them
+    data = pyvips.Image.black(32, 32).write_to_buffer(".png")
+    response = client.post("/upload", data={"file": (io.BytesIO(data), "sample.png")})
+    wait_for_job(client, response.get_json()["status_url"])
+    viewer.update_index("sample", None)
+    progress_path = tmp_path / "_progress_sample"
+    progress_path.write_text("100")
+    stale = time.time() - viewer.JOB_STALE_AFTER - 1
+    os.utime(progress_path, (stale, stale))
+    
+    status = client.get("/status/sample").get_json()
+    assert status["state"] == "done"
+    assert status["meta"]["width"] == 32
+    assert [image["name"] for image in client.get("/images").get_json()["images"]] == ["sample"]
+    
+    response = client.post("/upload", data={"file": (io.BytesIO(data), "sample.png")})
+    assert response.get_json()["cached"] is True
+    assert response.get_json()["meta"]["width"] == 32
+
+
+def test_tiles_without_metadata_are_converted_again(client, tmp_path):
+    data = pyvips.Image.black(32, 32).write_to_buffer(".png")
+    response = client.post("/upload", data={"file": (io.BytesIO(data), "sample.png")})
+    wait_for_job(client, response.get_json()["status_url"])
+    (tmp_path / "sample_meta.json.gz").unlink()
+    
+    response = client.post("/upload", data={"file": (io.BytesIO(data), "sample.png")})
+    assert response.status_code == 202
+    assert wait_for_job(client, response.get_json()["status_url"])["meta"]["width"] == 32